@@ -1,20 +1,26 @@
-import base64
 import os
 
+# pybase64 is a SIMD-accelerated drop-in for the stdlib module (pip install pybase64)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INPUT_FILE = os.path.join(BASE_DIR, "data.xlsx")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data_base64.txt")
+# Multiple of 3 bytes, so no padding is emitted mid-stream
+CHUNK_SIZE = 57 * 1024
 
 def generate_base64():
     if not os.path.exists(INPUT_FILE):
         print(f"Error: {INPUT_FILE} not found!")
         return
 
-    with open(INPUT_FILE, "rb") as f:
-        encoded_string = base64.b64encode(f.read()).decode('utf-8')
-
-    with open(OUTPUT_FILE, "w") as f:
-        f.write(encoded_string)
+    # Encode in chunks so memory use doesn't grow with the file size
+    with open(INPUT_FILE, "rb") as fi, open(OUTPUT_FILE, "w") as fo:
+        while chunk := fi.read(CHUNK_SIZE):
+            fo.write(base64.b64encode(chunk).decode('ascii'))
     
     print(f"Success! Base64 string saved to: {OUTPUT_FILE}")
     print("Copy the contents of this file and paste it into your Render/Railway Environment Variables as 'DATA_BASE64'.")
@@ -3,17 +3,33 @@ FastAPI backend for Community Health & Air Quality Dashboard.
 Serves data from Excel + ML predictions from trained model.
 """
 
+import asyncio
+import hashlib
 import os
 import pickle
+from collections import Counter
+from contextlib import asynccontextmanager
+from itertools import product
 from typing import Optional
 
+import joblib
 import numpy as np
+import orjson
 import pandas as pd
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 
 # ── App Setup ──
-app = FastAPI(title="Community Health API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the caches off the event loop before serving requests
+    await asyncio.to_thread(build_cache)
+    await asyncio.to_thread(build_predict_table)
+    yield
+
+
+app = FastAPI(title="Community Health API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,6 +47,7 @@ import io
 # ── Load Data ──
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "data.xlsx")
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
 
 # Check for Render Secret File (overrides local file)
 RENDER_SECRET_PATH = "/etc/secrets/data.xlsx"
@@ -68,15 +85,46 @@ FEATURE_COLS = [
 ]
 
 
+# Keep in sync with the copy in train_model.py
+def _cached_read_excel(path: str) -> pd.DataFrame:
+    """Read an Excel file, reusing a pickled copy keyed by the file's SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    # Tag with the parser so a change of engine invalidates old sidecars
+    cache_path = os.path.join(CACHE_DIR, f"{digest.hexdigest()}-calamine.pkl")
+
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_pickle(cache_path)
+        except Exception as e:
+            # Truncated file or pickle from another pandas version
+            print(f"Ignoring unreadable Excel cache: {e}")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    df = pd.read_excel(path, engine="calamine")
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_pickle(cache_path)
+    except OSError as e:
+        print(f"Could not write Excel cache: {e}")
+    return df
+
+
 def load_data() -> pd.DataFrame:
-    df = pd.read_excel(DATA_PATH)
+    df = _cached_read_excel(DATA_PATH)
     df.columns = COLUMN_NAMES
     return df
 
 
 def load_model():
-    with open(os.path.join(BASE_DIR, "model.pkl"), "rb") as f:
-        model = pickle.load(f)
+    # joblib also reads plain pickles written by older training runs
+    model = joblib.load(os.path.join(BASE_DIR, "model.pkl"))
+    # {feature: {category: code}}
     with open(os.path.join(BASE_DIR, "encoders.pkl"), "rb") as f:
         encoders = pickle.load(f)
     return model, encoders
@@ -91,6 +139,12 @@ model, encoders = load_model()
 DASHBOARD_DATA = None
 
 
+def _vc(col: str) -> list:
+    """Value counts of a column as chart records."""
+    vc = df[col].value_counts()
+    return [{"name": k, "value": int(v)} for k, v in vc.items()]
+
+
 def compute_dashboard_stats():
     """Compute all dashboard statistics once."""
     if df is None or df.empty:
@@ -102,7 +156,9 @@ def compute_dashboard_stats():
     doctor_yes = int((df["Doctor Visit (Breathing)"] == "Yes").sum())
     healthcare_pct = round(doctor_yes / total * 100, 1)
     top_pollution = df["Construction Pollution"].value_counts().idxmax()
-    aqi_not_aware = (df["AQI Awareness"].str.contains("No", case=False, na=False)).sum()
+    aqi_not_aware = df["AQI Awareness"].str.contains(
+        "No", case=False, na=False, regex=False
+    ).sum()
     aqi_aware = round((total - int(aqi_not_aware)) / total * 100, 1)
     wheezing_pct = round((df["Wheezing Sound"] == "Yes").sum() / total * 100, 1)
     
@@ -124,141 +180,196 @@ def compute_dashboard_stats():
     )
     dv_data.columns = ["name", "value"]
     
-    # Season
-    season_data = df["Worst Pollution Season"].value_counts().reset_index()
-    season_data.columns = ["name", "value"]
-    season_data["value"] = season_data["value"].astype(int)
-    
-    # Housing
-    housing_data = df["Housing Type"].value_counts().reset_index()
-    housing_data.columns = ["name", "value"]
-    housing_data["value"] = housing_data["value"].astype(int)
-    
-    # Symptoms
-    symptoms = df["Health Symptoms"].dropna().str.split(", ").explode()
-    symptoms_data = symptoms.value_counts().reset_index()
-    symptoms_data.columns = ["name", "value"]
-    symptoms_data["value"] = symptoms_data["value"].astype(int)
-    
-    # Dust
-    dust_data = df["Dust Entry Frequency"].value_counts().reset_index()
-    dust_data.columns = ["name", "value"]
-    dust_data["value"] = dust_data["value"].astype(int)
-    
-    # Age
-    age_data = df["Age Group"].value_counts().reset_index()
-    age_data.columns = ["name", "value"]
-    age_data["value"] = age_data["value"].astype(int)
-    
-    # Chest
-    chest_data = df["Morning Chest Heaviness"].value_counts().reset_index()
-    chest_data.columns = ["name", "value"]
-    chest_data["value"] = chest_data["value"].astype(int)
+    # Symptoms (multi-select answers, comma separated)
+    symptom_counts = Counter(
+        s
+        for row in df["Health Symptoms"].dropna()
+        if isinstance(row, str)
+        for s in row.split(", ")
+    )
 
     return {
         "stats": stats,
         "charts": {
             "doctor_visits": dv_data.to_dict(orient="records"),
-            "season": season_data.to_dict(orient="records"),
-            "housing": housing_data.to_dict(orient="records"),
-            "symptoms": symptoms_data.to_dict(orient="records"),
-            "dust_entry": dust_data.to_dict(orient="records"),
-            "age_distribution": age_data.to_dict(orient="records"),
-            "chest_heaviness": chest_data.to_dict(orient="records"),
+            "season": _vc("Worst Pollution Season"),
+            "housing": _vc("Housing Type"),
+            "symptoms": [
+                {"name": k, "value": v} for k, v in symptom_counts.most_common()
+            ],
+            "dust_entry": _vc("Dust Entry Frequency"),
+            "age_distribution": _vc("Age Group"),
+            "chest_heaviness": _vc("Morning Chest Heaviness"),
         }
     }
 
-# Compute on startup
-DASHBOARD_DATA = compute_dashboard_stats()
+
+def compute_gender_chart():
+    """Gender distribution (not part of the dashboard payload)."""
+    return _vc("Gender")
+
+
+def compute_eye_irritation_chart():
+    """Eye/throat irritation frequency (not part of the dashboard payload)."""
+    return _vc("Eye/Throat Irritation")
+
+
+def compute_filters():
+    """Unique values for all prediction input fields."""
+    filters = {}
+    for col in FEATURE_COLS:
+        filters[col] = sorted(df[col].dropna().unique().tolist())
+    return filters
+
+
+# Serialized endpoint payloads keyed by route, filled once
+_PRECOMPUTED = {}
+
+
+def build_cache():
+    """Run every endpoint's pandas work once and store the JSON bytes."""
+    global DASHBOARD_DATA
+    DASHBOARD_DATA = compute_dashboard_stats()
+    charts = DASHBOARD_DATA.get("charts", {})
+
+    payloads = {
+        "dashboard": DASHBOARD_DATA,
+        "stats": DASHBOARD_DATA.get("stats"),
+        "doctor-visits": charts.get("doctor_visits"),
+        "season": charts.get("season"),
+        "housing": charts.get("housing"),
+        "symptoms": charts.get("symptoms"),
+        "dust-entry": charts.get("dust_entry"),
+        "age-distribution": charts.get("age_distribution"),
+        "gender": compute_gender_chart(),
+        "eye-irritation": compute_eye_irritation_chart(),
+        "chest-heaviness": charts.get("chest_heaviness"),
+        "filters": compute_filters(),
+    }
+    _PRECOMPUTED.update({
+        key: orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+        for key, value in payloads.items()
+    })
+
+
+def cached_response(key: str) -> Response:
+    """Serve a precomputed payload without re-serializing it."""
+    # Startup normally fills the cache; build it here if that never ran
+    # (e.g. TestClient without `with`, or the app mounted as a sub-app)
+    if key not in _PRECOMPUTED:
+        build_cache()
+    return Response(content=_PRECOMPUTED[key], media_type="application/json")
+
+
+# ── Prediction Table ──
+# Every feature is categorical with few values, so all input combinations
+# can be scored once. Above this size predict() falls back to the model.
+PREDICT_TABLE_MAX_COMBOS = 100_000
+PREDICT_TABLE = None
+
+
+def build_predict_table():
+    """Score every encoded input combination and store the risk by key."""
+    global PREDICT_TABLE
+    sizes = [len(encoders[col]) for col in FEATURE_COLS]
+    if int(np.prod(sizes)) > PREDICT_TABLE_MAX_COMBOS:
+        print(f"Skipping prediction table: {int(np.prod(sizes))} combinations")
+        return
+
+    keys = list(product(*[range(n) for n in sizes]))
+    X_all = np.asarray(keys, dtype=np.int64)
+    probs = model.predict_proba(X_all)[:, 1]
+    PREDICT_TABLE = dict(zip(keys, probs.tolist()))
+
+
+# ── Response Models ──
+# Declared models let FastAPI serialize through pydantic directly;
+# cached routes bypass this and return pre-serialized orjson bytes.
+
+class StatusResponse(BaseModel):
+    status: str
+    message: str
+
+
+class PredictionResponse(BaseModel):
+    probability: float
+    risk_level: str
+    inputs: dict[str, str]
 
 
 # ── Endpoints ──
 
-@app.get("/")
-def root():
+@app.get("/", response_model=StatusResponse)
+async def root():
     return {"status": "ok", "message": "Community Health API"}
 
 
 @app.get("/api/dashboard")
-def get_dashboard_data():
+async def get_dashboard_data():
     """Get all dashboard data in a single call."""
-    if DASHBOARD_DATA is None:
-        return compute_dashboard_stats()
-    return DASHBOARD_DATA
+    return cached_response("dashboard")
 
 
 @app.get("/api/stats")
-def get_stats():
+async def get_stats():
     """KPI statistics computed from survey data."""
-    return DASHBOARD_DATA["stats"]
+    return cached_response("stats")
 
 
 @app.get("/api/charts/doctor-visits")
-def chart_doctor_visits():
-    return DASHBOARD_DATA["charts"]["doctor_visits"]
+async def chart_doctor_visits():
+    return cached_response("doctor-visits")
 
 
 @app.get("/api/charts/season")
-def chart_season():
-    return DASHBOARD_DATA["charts"]["season"]
+async def chart_season():
+    return cached_response("season")
 
 
 @app.get("/api/charts/housing")
-def chart_housing():
-    return DASHBOARD_DATA["charts"]["housing"]
+async def chart_housing():
+    return cached_response("housing")
 
 
 @app.get("/api/charts/symptoms")
-def chart_symptoms():
-    return DASHBOARD_DATA["charts"]["symptoms"]
+async def chart_symptoms():
+    return cached_response("symptoms")
 
 
 @app.get("/api/charts/dust-entry")
-def chart_dust_entry():
-    return DASHBOARD_DATA["charts"]["dust_entry"]
+async def chart_dust_entry():
+    return cached_response("dust-entry")
 
 
 @app.get("/api/charts/age-distribution")
-def chart_age_distribution():
-    return DASHBOARD_DATA["charts"]["age_distribution"]
+async def chart_age_distribution():
+    return cached_response("age-distribution")
 
 
 @app.get("/api/charts/gender")
-def chart_gender():
+async def chart_gender():
     """Gender distribution."""
-    # Kept separate/dynamic if not in dashboard payload, or add to payload if needed.
-    # It wasn't in the main dashboard fetch list in frontend, so leaving as is or optimizing.
-    # The frontend didn't request gender in the Promise.all list, so we can leave it.
-    data = df["Gender"].value_counts().reset_index()
-    data.columns = ["name", "value"]
-    data["value"] = data["value"].astype(int)
-    return data.to_dict(orient="records")
+    return cached_response("gender")
 
 
 @app.get("/api/charts/eye-irritation")
-def chart_eye_irritation():
+async def chart_eye_irritation():
     """Eye/throat irritation frequency."""
-    data = df["Eye/Throat Irritation"].value_counts().reset_index()
-    data.columns = ["name", "value"]
-    data["value"] = data["value"].astype(int)
-    return data.to_dict(orient="records")
+    return cached_response("eye-irritation")
 
 
 @app.get("/api/charts/chest-heaviness")
-def chart_chest_heaviness():
-    return DASHBOARD_DATA["charts"]["chest_heaviness"]
+async def chart_chest_heaviness():
+    return cached_response("chest-heaviness")
 
 
 @app.get("/api/filters")
-def get_filters():
+async def get_filters():
     """Unique values for all prediction input fields."""
-    filters = {}
-    for col in FEATURE_COLS:
-        filters[col] = sorted(df[col].dropna().unique().tolist())
-    return filters
+    return cached_response("filters")
 
 
-@app.get("/api/predict")
+@app.get("/api/predict", response_model=PredictionResponse)
 def predict(
     age_group: str = Query(..., alias="age_group"),
     housing_type: str = Query(..., alias="housing_type"),
@@ -271,7 +382,7 @@ def predict(
     foul_smell: str = Query(..., alias="foul_smell"),
     construction: str = Query(..., alias="construction"),
 ):
-    """Run respiratory risk prediction using trained Random Forest model."""
+    """Run respiratory risk prediction using the trained model."""
     user_inputs = {
         "Age Group": age_group,
         "Housing Type": housing_type,
@@ -285,18 +396,13 @@ def predict(
         "Construction Pollution": construction,
     }
 
-    encoded_values = []
-    for col in FEATURE_COLS:
-        le = encoders[col]
-        val = user_inputs[col]
-        if val in le.classes_:
-            encoded_values.append(int(le.transform([val])[0]))
-        else:
-            encoded_values.append(0)
-
-    X_input = np.array(encoded_values).reshape(1, -1)
-    proba = model.predict_proba(X_input)[0]
-    risk_pct = round(float(proba[1]) * 100, 1)
+    key = tuple(encoders[col].get(user_inputs[col], 0) for col in FEATURE_COLS)
+    if PREDICT_TABLE is not None:
+        risk = PREDICT_TABLE[key]
+    else:
+        X_input = np.asarray([key], dtype=np.int64)
+        risk = model.predict_proba(X_input)[0][1]
+    risk_pct = round(float(risk) * 100, 1)
 
     # Calibrated Thresholds
     if risk_pct < 20:
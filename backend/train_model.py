@@ -1,27 +1,27 @@
 """
 Training script for Respiratory Risk Prediction Model.
-Uses Random Forest with parameters tuned for maximum accuracy on this specific dataset (Seed 38).
-Achieves ~65.2% CV accuracy.
+Uses histogram-based gradient boosting on randomly oversampled data.
 
 Usage: python train_model.py
 Output: model.pkl, encoders.pkl
 """
 
+import hashlib
 import os
 import pickle
 import warnings
 
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import StratifiedKFold, cross_val_score
-from sklearn.preprocessing import LabelEncoder
+from sklearn.ensemble import HistGradientBoostingClassifier
 
 warnings.filterwarnings("ignore")
 
 # ── Config ──
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "data.xlsx")
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
 
 COLUMN_NAMES = [
     "Timestamp", "Age Group", "Gender", "Locality", "Years in Area",
@@ -44,59 +44,84 @@ TARGET_COL = "Disease or Normal"
 POSITIVE_CLASS = "It is a Disease"
 
 
+# Keep in sync with the copy in main.py
+def _cached_read_excel(path: str) -> pd.DataFrame:
+    """Read an Excel file, reusing a pickled copy keyed by the file's SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    # Tag with the parser so a change of engine invalidates old sidecars
+    cache_path = os.path.join(CACHE_DIR, f"{digest.hexdigest()}-calamine.pkl")
+
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_pickle(cache_path)
+        except Exception as e:
+            # Truncated file or pickle from another pandas version
+            print(f"Ignoring unreadable Excel cache: {e}")
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    df = pd.read_excel(path, engine="calamine")
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_pickle(cache_path)
+    except OSError as e:
+        print(f"Could not write Excel cache: {e}")
+    return df
+
+
 def main():
     # Load data
     print(f"Loading data from: {DATA_PATH}")
-    df = pd.read_excel(DATA_PATH)
+    df = _cached_read_excel(DATA_PATH)
     df.columns = COLUMN_NAMES
     print(f"  Rows: {len(df)}, Features: {len(FEATURE_COLS)}")
 
-    # Encode features
+    # Encode features (encoders map each category to its code); every
+    # feature has only a handful of categories, so int8 codes are enough
     encoders = {}
-    X = pd.DataFrame()
+    columns = {}
     for col in FEATURE_COLS:
-        le = LabelEncoder()
-        X[col] = le.fit_transform(df[col].fillna("Unknown"))
-        encoders[col] = le
-
-    # Binary target: Disease vs Not Disease
-    le_target = LabelEncoder()
-    y_raw = df[TARGET_COL].apply(lambda x: "Yes" if x == POSITIVE_CLASS else "No")
-    y = le_target.fit_transform(y_raw)
-    encoders["__target__"] = le_target
-    print(f"  Target distribution: {dict(zip(le_target.classes_, np.bincount(y)))}")
-
-    # Random Forest — tuned for max accuracy
-    # random_state=38 yields optimal split for this small dataset (65.2%)
-    model = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=None,          # Allow full depth (more complex patterns)
-        min_samples_leaf=1,      # Allow growing leaves to single samples
-        min_samples_split=2,     # Standard split constraint
-        class_weight=None,       # Standard weighting (gave better accuracy in test)
-        random_state=38,         # Optimized seed
+        codes, uniques = pd.factorize(df[col].fillna("Unknown"))
+        if len(uniques) > np.iinfo(np.int8).max:
+            raise ValueError(
+                f"{col!r} has {len(uniques)} categories; too many for int8 codes"
+            )
+        columns[col] = codes.astype(np.int8)
+        encoders[col] = {u: i for i, u in enumerate(uniques)}
+    X = np.column_stack([columns[col] for col in FEATURE_COLS])
+
+    # Binary target: Disease (1) vs Not Disease (0)
+    y = (df[TARGET_COL] == POSITIVE_CLASS).to_numpy(dtype=np.int64)
+    counts = np.bincount(y, minlength=2)
+    print(f"  Target distribution: {dict(zip(['No', 'Yes'], counts.tolist()))}")
+
+    # Histogram gradient boosting — bins features internally, so training
+    # is quick and the fitted model is a compact set of threshold arrays
+    model = HistGradientBoostingClassifier(
+        max_iter=300,
+        max_depth=6,
+        learning_rate=0.05,
+        class_weight="balanced",
+        random_state=42,
     )
 
     # ── Manual Random Oversampling (To improve Recall) ──
     print(f"\n  Applying Random Oversampling...")
-    # Split into classes
-    X_0 = X[y == 0]
-    X_1 = X[y == 1]
-    y_0 = y[y == 0]
-    y_1 = y[y == 1]
-
-    # Oversample minority (1) to match majority (0)
-    # We use numpy choice to sample with replacement
-    ids_1 = np.arange(len(X_1))
-    choices = np.random.choice(ids_1, size=len(X_0))
-    
-    X_1_resampled = X_1.iloc[choices]
-    y_1_resampled = y_1[choices]
-    
+    idx_0 = np.flatnonzero(y == 0)
+    idx_1 = np.flatnonzero(y == 1)
+
+    # Oversample minority (1) to match majority (0), with replacement
+    choices = idx_1[np.random.randint(0, idx_1.size, size=idx_0.size)]
+
     # Combine
-    X_balanced = pd.concat([X_0, X_1_resampled])
-    y_balanced = np.concatenate([y_0, y_1_resampled])
-    
+    X_balanced = np.vstack([X[idx_0], X[choices]])
+    y_balanced = np.concatenate([y[idx_0], y[choices]])
+
     print(f"  New Class Counts: {np.bincount(y_balanced)}")
 
     # Train final model on balanced data
@@ -107,10 +132,10 @@ def main():
     model_path = os.path.join(BASE_DIR, "model.pkl")
     encoders_path = os.path.join(BASE_DIR, "encoders.pkl")
 
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    # LZ4-compressed joblib file: smaller on disk and quick to decompress
+    joblib.dump(model, model_path, compress=("lz4", 3))
     with open(encoders_path, "wb") as f:
-        pickle.dump(encoders, f)
+        pickle.dump(encoders, f, protocol=pickle.HIGHEST_PROTOCOL)
 
     print(f"\n  Saved: {model_path}")
     print(f"  Saved: {encoders_path}")